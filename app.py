@@ -40,7 +40,8 @@ class MoneyAllocApp(tk.Tk):
 
         self.refresh_tree()
         self.refresh_buckets()
-        self.refresh_results()
+        # refresh_portfolios compares against the latest portfolio, so skip doing it twice.
+        self.refresh_results(show_recommendations=False)
         self.refresh_portfolios()
 
     # ------------------------------------------------------------------ Tab 1
@@ -112,19 +113,20 @@ class MoneyAllocApp(tk.Tk):
         for allocation_record in allocations:
             by_parent.setdefault(allocation_record.parent_id, []).append(allocation_record)
 
-        def insert_children(parent_tree_id: Optional[str], parent_id: Optional[int]) -> None:
-            for record in by_parent.get(parent_id, []):
-                tree_parent = parent_tree_id or ""
-                tree_id = self.tree.insert(
-                    tree_parent,
-                    tk.END,
-                    text=record.name,
-                    values=(record.name, f"{record.percentage:.2f}", "Yes" if record.is_leaf else "No"),
-                )
-                self.tree_id_map[tree_id] = record.id
-                insert_children(tree_id, record.id)
-
-        insert_children("", None)
+        # Iterative pre-order walk; children are pushed in reverse to keep sibling order.
+        stack: list[tuple[str, AllocationRecord]] = [
+            ("", record) for record in reversed(by_parent.get(None, []))
+        ]
+        while stack:
+            tree_parent, record = stack.pop()
+            tree_id = self.tree.insert(
+                tree_parent,
+                tk.END,
+                text=record.name,
+                values=(record.name, f"{record.percentage:.2f}", "Yes" if record.is_leaf else "No"),
+            )
+            self.tree_id_map[tree_id] = record.id
+            stack.extend((tree_id, child) for child in reversed(by_parent.get(record.id, [])))
 
     def on_tree_select(self, event: tk.Event) -> None:
         selected = self.tree.selection()
@@ -134,7 +136,7 @@ class MoneyAllocApp(tk.Tk):
         allocation_id = self.tree_id_map.get(tree_id)
         if allocation_id is None:
             return
-        record = next((r for r in self.db.get_allocations() if r.id == allocation_id), None)
+        record = self.db.get_allocation(allocation_id)
         if not record:
             return
         self.name_entry.delete(0, tk.END)
@@ -257,8 +259,7 @@ class MoneyAllocApp(tk.Tk):
         if not buckets:
             messagebox.showinfo("No leaves", "No leaf allocations available to build buckets")
             return
-        self.db.clear_buckets()
-        self.db.save_buckets(buckets)
+        self.db.replace_buckets(buckets)
         self.refresh_buckets()
         messagebox.showinfo("Buckets generated", "Allocation buckets have been updated")
         self.notebook.select(self.tab2)
@@ -328,16 +329,15 @@ class MoneyAllocApp(tk.Tk):
             self.bucket_rows[bucket_key] = row_entries
 
     def save_tenor_inputs(self, show_message: bool = True) -> None:
-        for bucket_key, entries in self.bucket_rows.items():
-            dv01 = entries["dv01_tenors"].get().strip()
-            bei01 = entries["bei01_tenors"].get().strip()
-            cs01 = entries["cs01_tenors"].get().strip()
-            self.db.save_tenor_input(
-                bucket_key,
-                dv01_tenors=dv01,
-                bei01_tenors=bei01,
-                cs01_tenors=cs01,
+        self.db.save_tenor_inputs(
+            TenorInputRecord(
+                bucket_key=bucket_key,
+                dv01_tenors=entries["dv01_tenors"].get().strip(),
+                bei01_tenors=entries["bei01_tenors"].get().strip(),
+                cs01_tenors=entries["cs01_tenors"].get().strip(),
             )
+            for bucket_key, entries in self.bucket_rows.items()
+        )
         self.db.set_setting("total_amount", self.total_amount_entry.get().strip())
         if show_message:
             messagebox.showinfo("Saved", "Tenor inputs saved")
@@ -371,8 +371,7 @@ class MoneyAllocApp(tk.Tk):
                 }
 
         results = allocation.calculate_results(buckets, tenor_inputs, total_amount)
-        self.db.clear_results()
-        self.db.save_results(results)
+        self.db.replace_results(results)
         self.refresh_results()
         self.notebook.select(self.tab3)
         messagebox.showinfo("Calculation complete", "Risk balancing complete")
@@ -441,7 +440,7 @@ class MoneyAllocApp(tk.Tk):
             self.portfolio_tree.column(column, width=200, stretch=True)
         self.portfolio_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
 
-    def refresh_results(self) -> None:
+    def refresh_results(self, show_recommendations: bool = True) -> None:
         for item in self.result_tree.get_children():
             self.result_tree.delete(item)
         results = self.db.get_results()
@@ -453,9 +452,9 @@ class MoneyAllocApp(tk.Tk):
         spread = max(exposures) - min(exposures) if len(exposures) > 1 else 0.0
         average_exposure = sum(exposures) / len(exposures) if exposures else 0.0
 
-        buckets = {bucket.bucket_key: bucket for bucket in self.db.get_buckets()}
+        bucket_map = {bucket.bucket_key: bucket for bucket in self.db.get_buckets()}
         for result in results:
-            bucket = buckets.get(result.bucket_key)
+            bucket = bucket_map.get(result.bucket_key)
             bucket_label = result.bucket_key
             if bucket:
                 bucket_label = f"{bucket.currency} / {bucket.time_horizon}y"
@@ -476,9 +475,9 @@ class MoneyAllocApp(tk.Tk):
             f"Exposure spread: {spread:.2f}; average exposure: {average_exposure:.2f}"
         )
 
-        bucket_map = {bucket.bucket_key: bucket for bucket in self.db.get_buckets()}
         self.current_positions = allocation.results_to_positions(results, bucket_map)
-        self.update_recommendations()
+        if show_recommendations:
+            self.update_recommendations()
 
     def refresh_portfolios(self) -> None:
         for item in self.portfolio_tree.get_children():
@@ -555,5 +554,6 @@ class MoneyAllocApp(tk.Tk):
 
 if __name__ == "__main__":
     app = MoneyAllocApp()
-    app.mainloop()
+    with app.db:
+        app.mainloop()
 
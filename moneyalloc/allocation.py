@@ -2,16 +2,17 @@
 
 from __future__ import annotations
 
+import functools
+import heapq
 import itertools
 import math
 from dataclasses import dataclass
-from statistics import mean, pstdev
 from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
 
 from .database import AllocationRecord, BucketRecord, ResultRecord
 
 
-@dataclass
+@dataclass(slots=True)
 class LeafAllocation:
     bucket_key: str
     time_horizon: float
@@ -19,7 +20,7 @@ class LeafAllocation:
     percentage: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Recommendation:
     action: str
     risk_group: str
@@ -37,41 +38,41 @@ def build_leaf_allocations(allocations: Iterable[AllocationRecord]) -> List[Leaf
     """Build leaf allocations from a collection of allocation records."""
 
     by_parent: Dict[int | None, List[AllocationRecord]] = {}
-    lookup: Dict[int, AllocationRecord] = {}
     for allocation in allocations:
-        lookup[allocation.id] = allocation
         by_parent.setdefault(allocation.parent_id, []).append(allocation)
 
     leaves: List[LeafAllocation] = []
 
-    def traverse(node: AllocationRecord, cumulative: float) -> None:
-        current = cumulative * (node.percentage / 100.0)
+    # Depth-first walk with an explicit stack; children are pushed in reverse so
+    # leaves come out in the same pre-order as the tree. ``cumulative`` is
+    # carried as a percentage of the whole tree, so leaf shares need no further
+    # rescaling.
+    stack: List[Tuple[AllocationRecord, float]] = [
+        (root, 100.0) for root in reversed(by_parent.get(None, []))
+    ]
+    while stack:
+        node, cumulative = stack.pop()
+        current = cumulative * node.percentage / 100.0
         children = by_parent.get(node.id, [])
         if node.is_leaf or not children:
-            if not node.currencies:
-                return
-            currencies = [c.strip() for c in node.currencies.split(",") if c.strip()]
+            if not node.currencies or node.time_horizon is None:
+                continue
+            codes = (c.strip().upper() for c in node.currencies.split(","))
+            currencies = [code for code in codes if code]
             if not currencies:
-                return
-            if node.time_horizon is None:
-                return
-            currency_share = current * 100.0 / len(currencies)
+                continue
+            currency_share = current / len(currencies)
             for currency in currencies:
-                bucket_key = f"{node.time_horizon}|{currency.upper()}"
                 leaves.append(
                     LeafAllocation(
-                        bucket_key=bucket_key,
+                        bucket_key=f"{node.time_horizon}|{currency}",
                         time_horizon=node.time_horizon,
-                        currency=currency.upper(),
+                        currency=currency,
                         percentage=currency_share,
                     )
                 )
         else:
-            for child in children:
-                traverse(child, current)
-
-    for root in by_parent.get(None, []):
-        traverse(root, 1.0)
+            stack.extend((child, current) for child in reversed(children))
 
     return leaves
 
@@ -93,6 +94,20 @@ def build_bucket_records(leaves: Sequence[LeafAllocation]) -> List[BucketRecord]
 
 
 def parse_tenor_string(value: str) -> List[float]:
+    return list(_parse_tenors(value))
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_tenors(value: str) -> Tuple[float, ...]:
+    """Parse a comma separated tenor list, cached as the same inputs recur on every calculation."""
+
+    try:
+        # Fast path for well-formed input such as "1, 2, 5"; float() ignores
+        # surrounding whitespace itself.
+        return tuple([float(item) for item in value.split(",")])
+    except ValueError:
+        pass
+
     tenors: List[float] = []
     for item in value.split(","):
         item = item.strip()
@@ -102,7 +117,19 @@ def parse_tenor_string(value: str) -> List[float]:
             tenors.append(float(item))
         except ValueError:
             continue
-    return tenors
+    return tuple(tenors)
+
+
+def _pstdev(values: Sequence[float]) -> float:
+    """Population standard deviation in plain float arithmetic.
+
+    ``statistics.pstdev`` converts every value to an exact fraction, which
+    dominates the exhaustive search. ``math.fsum`` is exactly rounded, so
+    equal multisets of exposures still compare equal whatever their order.
+    """
+    count = len(values)
+    average = math.fsum(values) / count
+    return math.sqrt(math.fsum((value - average) ** 2 for value in values) / count)
 
 
 def _calc_dv01_combination(
@@ -111,40 +138,101 @@ def _calc_dv01_combination(
 ) -> Tuple[List[float], float, float]:
     """Try all tenor combinations to minimise spread and variance."""
 
+    tenors, spread, variance = _search_dv01_combination(tuple(tuple(o) for o in options))
+    return list(tenors), spread, variance
+
+
+@functools.lru_cache(maxsize=32)
+def _search_dv01_combination(
+    options: Tuple[Tuple[Tuple[float, float], ...], ...],
+) -> Tuple[Tuple[float, ...], float, float]:
+    """Search for the best tenor combination, cached so unchanged inputs are not re-solved."""
+
     combination_count = math.prod(len(o) for o in options) if options else 0
     if combination_count == 0:
-        return [], float("inf"), float("inf")
+        return (), float("inf"), float("inf")
+
+    if len(options) == 1:
+        # A single bucket has no spread to balance; its first tenor wins every tie.
+        return (options[0][0][0],), 0.0, 0.0
+
+    if combination_count == 1:
+        # Every bucket has a single eligible tenor, so there is nothing to search.
+        tenors = tuple(choices[0][0] for choices in options)
+        exposures = [choices[0][1] for choices in options]
+        return tenors, max(exposures) - min(exposures), _pstdev(exposures)
 
-    best_tenors: List[float] = []
+    best_tenors: Tuple[float, ...] = ()
     best_spread = float("inf")
     best_variance = float("inf")
 
     if combination_count <= 50000:
-        for candidate in itertools.product(*options):
-            tenors = [c[0] for c in candidate]
-            exposures = [c[1] for c in candidate]
+        # Walk tenor and exposure products in lockstep so each candidate is
+        # already a flat tuple and no per-candidate list has to be built.
+        tenor_options = [[c[0] for c in choices] for choices in options]
+        exposure_options = [[c[1] for c in choices] for choices in options]
+        for tenors, exposures in zip(
+            itertools.product(*tenor_options), itertools.product(*exposure_options)
+        ):
             spread = max(exposures) - min(exposures)
-            variance = pstdev(exposures)
-            if spread < best_spread or (math.isclose(spread, best_spread) and variance < best_variance):
+            # Most candidates lose on spread alone; only near-ties and
+            # improvements need the dispersion tie-break.
+            if spread > best_spread and not math.isclose(spread, best_spread):
+                continue
+            variance = _pstdev(exposures)
+            if spread < best_spread or variance < best_variance:
                 best_spread = spread
                 best_variance = variance
                 best_tenors = tenors
     else:
-        # Greedy approximation: aim for the mean of mid-range exposures.
-        midpoint = mean([(min(o, key=lambda x: x[1])[1] + max(o, key=lambda x: x[1])[1]) / 2 for o in options])
-        best_tenors = []
-        best_spread = float("inf")
-        exposures: List[float] = []
-        for choices in options:
-            tenor, exposure = min(choices, key=lambda x: abs(x[1] - midpoint))
-            best_tenors.append(tenor)
-            exposures.append(exposure)
+        candidate = _min_spread_combination(options)
+        exposures = [c[1] for c in candidate]
+        best_tenors = tuple(c[0] for c in candidate)
         best_spread = max(exposures) - min(exposures)
-        best_variance = pstdev(exposures) if len(exposures) > 1 else 0.0
+        best_variance = _pstdev(exposures)
 
     return best_tenors, best_spread, best_variance
 
 
+def _min_spread_combination(
+    options: Sequence[Sequence[Tuple[float, float]]],
+) -> List[Tuple[float, float]]:
+    """Pick one option per bucket so that the exposure spread is minimal.
+
+    Sweeps the exposures in ascending order while keeping one candidate per
+    bucket on a heap (the "smallest range covering every list" problem), which
+    finds the narrowest window in O(N log B) instead of enumerating every
+    combination. Inside that window each bucket takes the option closest to its
+    centre to keep the variance low.
+    """
+
+    sorted_options = [sorted(choices, key=lambda c: c[1]) for choices in options]
+    heap = [(choices[0][1], index, 0) for index, choices in enumerate(sorted_options)]
+    heapq.heapify(heap)
+    window_high = max(entry[0] for entry in heap)
+    best_low, best_high = heap[0][0], window_high
+
+    while True:
+        low, index, position = heapq.heappop(heap)
+        if window_high - low < best_high - best_low:
+            best_low, best_high = low, window_high
+        position += 1
+        if position == len(sorted_options[index]):
+            break
+        exposure = sorted_options[index][position][1]
+        window_high = max(window_high, exposure)
+        heapq.heappush(heap, (exposure, index, position))
+
+    midpoint = (best_low + best_high) / 2
+    return [
+        min(
+            (c for c in choices if best_low <= c[1] <= best_high),
+            key=lambda c: abs(c[1] - midpoint),
+        )
+        for choices in sorted_options
+    ]
+
+
 def calculate_results(
     buckets: Sequence[BucketRecord],
     tenor_inputs: Dict[str, Dict[str, List[float]]],
@@ -159,34 +247,33 @@ def calculate_results(
     amounts = []
     options: List[List[Tuple[float, float]]] = []
     group_availability: Dict[str, set[str]] = {}
+    amount_per_percent = total_amount / 100.0
 
     for bucket in buckets:
-        bucket_amount = total_amount * (bucket.percentage / 100.0)
+        bucket_amount = amount_per_percent * bucket.percentage
         amounts.append(bucket_amount)
         bucket_tenors = tenor_inputs.get(bucket.bucket_key, {})
-        dv01_tenors = [
-            t for t in bucket_tenors.get("DV01", []) if t <= bucket.time_horizon + 1e-9
-        ]
+        max_tenor = bucket.time_horizon + 1e-9
+        dv01_tenors = [t for t in bucket_tenors.get("DV01", []) if t <= max_tenor]
         if not dv01_tenors:
             # Default to min(time_horizon, 1) if no valid tenor provided
             fallback = min(bucket.time_horizon, 1.0)
             dv01_tenors = [fallback]
         options.append([(tenor, bucket_amount * tenor) for tenor in dv01_tenors])
 
+        # Only the presence of an eligible BEI01/CS01 tenor matters, so stop at the first one.
         available_groups = {"DV01"}
-        bei01_tenors = [
-            t for t in bucket_tenors.get("BEI01", []) if t <= bucket.time_horizon + 1e-9
-        ]
-        cs01_tenors = [
-            t for t in bucket_tenors.get("CS01", []) if t <= bucket.time_horizon + 1e-9
-        ]
-        if bei01_tenors:
+        if any(t <= max_tenor for t in bucket_tenors.get("BEI01", [])):
             available_groups.add("BEI01")
-        if cs01_tenors:
+        if any(t <= max_tenor for t in bucket_tenors.get("CS01", [])):
             available_groups.add("CS01")
         group_availability[bucket.bucket_key] = available_groups
 
-    best_tenors, _, _ = _calc_dv01_combination(bucket_keys, options)
+    if any(amounts):
+        best_tenors, _, _ = _calc_dv01_combination(bucket_keys, options)
+    else:
+        # Every exposure is zero, so all combinations tie; keep the first tenors.
+        best_tenors = []
     if not best_tenors:
         best_tenors = [choices[0][0] for choices in options]
 
@@ -245,13 +332,16 @@ def build_recommendations(
 ) -> List[Recommendation]:
     """Compare two position sets and suggest trades beyond a margin."""
 
-    keys = set(baseline) | set(current)
+    # Keys are (risk_group, currency, tenor) tuples, so sorting them directly
+    # yields the output order without a key callback.
+    keys = sorted(baseline.keys() | current.keys())
+    threshold = max(margin, 0.0)
     recommendations: List[Recommendation] = []
     for key in keys:
         baseline_amount = baseline.get(key, 0.0)
         current_amount = current.get(key, 0.0)
         difference = current_amount - baseline_amount
-        if abs(difference) <= max(margin, 0.0):
+        if abs(difference) <= threshold:
             continue
         action = "Buy" if difference > 0 else "Sell"
         recommendations.append(
@@ -264,6 +354,5 @@ def build_recommendations(
             )
         )
 
-    recommendations.sort(key=lambda rec: (rec.risk_group, rec.currency, rec.tenor))
     return recommendations
 
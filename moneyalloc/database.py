@@ -13,7 +13,7 @@ from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 DB_FILENAME = "moneyalloc.db"
 
 
-@dataclass
+@dataclass(slots=True)
 class AllocationRecord:
     id: int
     parent_id: Optional[int]
@@ -24,7 +24,7 @@ class AllocationRecord:
     is_leaf: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class BucketRecord:
     bucket_key: str
     time_horizon: float
@@ -32,7 +32,7 @@ class BucketRecord:
     percentage: float
 
 
-@dataclass
+@dataclass(slots=True)
 class TenorInputRecord:
     bucket_key: str
     dv01_tenors: str
@@ -40,7 +40,7 @@ class TenorInputRecord:
     cs01_tenors: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ResultRecord:
     bucket_key: str
     amount: float
@@ -50,14 +50,14 @@ class ResultRecord:
     dv01_exposure: float
 
 
-@dataclass
+@dataclass(slots=True)
 class PortfolioRecord:
     id: int
     name: str
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PortfolioPosition:
     portfolio_id: int
     risk_group: str
@@ -66,17 +66,30 @@ class PortfolioPosition:
     amount: float
 
 
+def _allocation_from_row(row: Tuple) -> AllocationRecord:
+    """Map an ``allocations`` row selected in column order to a record."""
+    return AllocationRecord(
+        id=row[0],
+        parent_id=row[1],
+        name=row[2],
+        percentage=row[3],
+        currencies=row[4] or "",
+        time_horizon=row[5],
+        is_leaf=bool(row[6]),
+    )
+
+
 class Database:
     """Simple wrapper around SQLite operations."""
 
     def __init__(self, path: str | Path = DB_FILENAME) -> None:
         self.db_path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
         self._ensure_initialised()
 
     def _ensure_initialised(self) -> None:
         with self._connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+            conn.executescript(
                 """
                 CREATE TABLE IF NOT EXISTS allocations (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -86,39 +99,27 @@ class Database:
                     currencies TEXT DEFAULT '',
                     time_horizon REAL,
                     is_leaf INTEGER NOT NULL DEFAULT 0
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS buckets (
                     bucket_key TEXT PRIMARY KEY,
                     time_horizon REAL NOT NULL,
                     currency TEXT NOT NULL,
                     percentage REAL NOT NULL
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS tenor_inputs (
                     bucket_key TEXT PRIMARY KEY,
                     dv01_tenors TEXT DEFAULT '',
                     bei01_tenors TEXT DEFAULT '',
                     cs01_tenors TEXT DEFAULT ''
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS settings (
                     key TEXT PRIMARY KEY,
                     value TEXT NOT NULL
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS results (
                     bucket_key TEXT PRIMARY KEY,
                     amount REAL NOT NULL,
@@ -126,20 +127,14 @@ class Database:
                     bei01_tenor REAL NOT NULL,
                     cs01_tenor REAL NOT NULL,
                     dv01_exposure REAL NOT NULL
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS portfolios (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
                     created_at TEXT NOT NULL
-                )
-                """
-            )
-            cursor.execute(
-                """
+                );
+
                 CREATE TABLE IF NOT EXISTS portfolio_positions (
                     portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
                     risk_group TEXT NOT NULL,
@@ -147,19 +142,34 @@ class Database:
                     tenor REAL NOT NULL,
                     amount REAL NOT NULL,
                     PRIMARY KEY (portfolio_id, risk_group, currency, tenor)
-                )
+                );
                 """
             )
-            conn.commit()
 
     @contextmanager
     def _connection(self) -> Iterator[sqlite3.Connection]:
-        conn = sqlite3.connect(self.db_path)
+        # A single long-lived connection keeps sqlite3's prepared statement
+        # cache warm across calls instead of re-parsing every query.
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
         try:
-            yield conn
-        finally:
-            conn.commit()
-            conn.close()
+            yield self._conn
+        except BaseException:
+            self._conn.rollback()
+            raise
+        else:
+            self._conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> Database:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
     # Allocation operations -------------------------------------------------
     def add_allocation(
@@ -215,26 +225,22 @@ class Database:
                 "SELECT id, parent_id, name, percentage, currencies, time_horizon, is_leaf FROM allocations"
             )
             rows = cursor.fetchall()
-        return [
-            AllocationRecord(
-                id=row[0],
-                parent_id=row[1],
-                name=row[2],
-                percentage=row[3],
-                currencies=row[4] or "",
-                time_horizon=row[5],
-                is_leaf=bool(row[6]),
+        return [_allocation_from_row(row) for row in rows]
+
+    def get_allocation(self, allocation_id: int) -> Optional[AllocationRecord]:
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, parent_id, name, percentage, currencies, time_horizon, is_leaf FROM allocations WHERE id = ?",
+                (allocation_id,),
             )
-            for row in rows
-        ]
+            row = cursor.fetchone()
+        return _allocation_from_row(row) if row else None
 
     # Bucket operations -----------------------------------------------------
-    def clear_buckets(self) -> None:
+    def replace_buckets(self, buckets: Iterable[BucketRecord]) -> None:
         with self._connection() as conn:
             conn.execute("DELETE FROM buckets")
-
-    def save_buckets(self, buckets: Iterable[BucketRecord]) -> None:
-        with self._connection() as conn:
             conn.executemany(
                 """
                 INSERT OR REPLACE INTO buckets (bucket_key, time_horizon, currency, percentage)
@@ -264,21 +270,17 @@ class Database:
         ]
 
     # Tenor inputs ----------------------------------------------------------
-    def save_tenor_input(
-        self,
-        bucket_key: str,
-        *,
-        dv01_tenors: str,
-        bei01_tenors: str,
-        cs01_tenors: str,
-    ) -> None:
+    def save_tenor_inputs(self, records: Iterable[TenorInputRecord]) -> None:
         with self._connection() as conn:
-            conn.execute(
+            conn.executemany(
                 """
                 INSERT OR REPLACE INTO tenor_inputs (bucket_key, dv01_tenors, bei01_tenors, cs01_tenors)
                 VALUES (?, ?, ?, ?)
                 """,
-                (bucket_key, dv01_tenors, bei01_tenors, cs01_tenors),
+                [
+                    (record.bucket_key, record.dv01_tenors, record.bei01_tenors, record.cs01_tenors)
+                    for record in records
+                ],
             )
 
     def get_tenor_inputs(self) -> Dict[str, TenorInputRecord]:
@@ -312,12 +314,9 @@ class Database:
         return row[0] if row else None
 
     # Results ---------------------------------------------------------------
-    def clear_results(self) -> None:
+    def replace_results(self, results: Iterable[ResultRecord]) -> None:
         with self._connection() as conn:
             conn.execute("DELETE FROM results")
-
-    def save_results(self, results: Iterable[ResultRecord]) -> None:
-        with self._connection() as conn:
             conn.executemany(
                 """
                 INSERT OR REPLACE INTO results (bucket_key, amount, dv01_tenor, bei01_tenor, cs01_tenor, dv01_exposure)
@@ -385,7 +384,7 @@ class Database:
         with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT id, name, created_at FROM portfolios ORDER BY datetime(created_at) DESC"
+                "SELECT id, name, created_at FROM portfolios ORDER BY datetime(created_at) DESC, id DESC"
             )
             rows = cursor.fetchall()
         return [PortfolioRecord(id=row[0], name=row[1], created_at=row[2]) for row in rows]
@@ -410,6 +409,11 @@ class Database:
         }
 
     def get_latest_portfolio(self) -> Optional[PortfolioRecord]:
-        portfolios = self.list_portfolios()
-        return portfolios[0] if portfolios else None
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, name, created_at FROM portfolios ORDER BY datetime(created_at) DESC, id DESC LIMIT 1"
+            )
+            row = cursor.fetchone()
+        return PortfolioRecord(id=row[0], name=row[1], created_at=row[2]) if row else None
 